@@ -0,0 +1,145 @@
+import asyncio
+import json
+import os
+import queue
+import random
+import threading
+
+import websockets
+
+DEFAULT_SERVER_URL = os.environ.get('QUIZ_SERVER_URL', 'ws://192.168.1.101:8000')
+
+
+class QuizConnection:
+    """Conexão WebSocket com a sala, rodando num loop asyncio em thread própria.
+
+    A UI (ou um teste headless) conversa com a conexão apenas por filas:
+    `send()` enfileira uma mensagem sem bloquear e `events` recebe tuplas
+    `(tipo, dados)` com tipo em 'open', 'message', 'reconnecting', 'error'
+    e 'closed'.
+    """
+
+    def __init__(self, quiz_code, server_url=None, on_connect=None,
+                 heartbeat_interval=20, min_backoff=0.5, max_backoff=30):
+        server_url = (server_url or DEFAULT_SERVER_URL).rstrip('/')
+        self.url = f"{server_url}/ws/quiz/{quiz_code}/"
+        # Função que devolve as mensagens enviadas a cada (re)conexão, ex.: join
+        self.on_connect = on_connect or (lambda: [])
+        self.heartbeat_interval = heartbeat_interval
+        self.min_backoff = min_backoff
+        self.max_backoff = max_backoff
+
+        self.events = queue.Queue()
+        self._outgoing = None
+        self._pending = None
+        self._loop = None
+        self._stop = None
+        self._thread = None
+        self._ready = threading.Event()
+
+    def start(self):
+        self._thread = threading.Thread(target=self._run, daemon=True)
+        self._thread.start()
+        self._ready.wait()
+
+    def send(self, message):
+        # Nunca bloqueia: a mensagem vai para a fila do loop asyncio
+        if self._loop is None or self._loop.is_closed():
+            return
+        try:
+            self._loop.call_soon_threadsafe(self._outgoing.put_nowait, message)
+        except RuntimeError:
+            pass  # loop já encerrado
+
+    def close(self):
+        if self._loop is None:
+            return
+        try:
+            self._loop.call_soon_threadsafe(self._stop.set)
+        except RuntimeError:
+            pass
+
+    def join(self, timeout=None):
+        if self._thread:
+            self._thread.join(timeout)
+
+    def poll(self):
+        """Devolve todos os eventos pendentes sem bloquear."""
+        events = []
+        while True:
+            try:
+                events.append(self.events.get_nowait())
+            except queue.Empty:
+                return events
+
+    def _run(self):
+        self._loop = asyncio.new_event_loop()
+        asyncio.set_event_loop(self._loop)
+        self._outgoing = asyncio.Queue()
+        self._stop = asyncio.Event()
+        self._ready.set()
+        try:
+            self._loop.run_until_complete(self._main())
+        finally:
+            self._loop.close()
+            self.events.put(('closed', None))
+
+    async def _main(self):
+        backoff = self.min_backoff
+        while not self._stop.is_set():
+            try:
+                async with websockets.connect(
+                    self.url,
+                    ping_interval=self.heartbeat_interval,
+                    ping_timeout=self.heartbeat_interval,
+                ) as ws:
+                    backoff = self.min_backoff
+                    for message in self.on_connect():
+                        await ws.send(json.dumps(message))
+                    self.events.put(('open', None))
+                    await self._serve(ws)
+            except (OSError, asyncio.TimeoutError,
+                    websockets.exceptions.WebSocketException) as e:
+                self.events.put(('error', str(e)))
+
+            if self._stop.is_set():
+                break
+
+            # Backoff exponencial com jitter antes de tentar de novo
+            delay = random.uniform(0, backoff)
+            self.events.put(('reconnecting', delay))
+            backoff = min(backoff * 2, self.max_backoff)
+            try:
+                await asyncio.wait_for(self._stop.wait(), timeout=delay)
+            except asyncio.TimeoutError:
+                pass
+
+    async def _serve(self, ws):
+        tasks = [
+            asyncio.create_task(self._reader(ws)),
+            asyncio.create_task(self._writer(ws)),
+            asyncio.create_task(self._stop.wait()),
+        ]
+        try:
+            done, _ = await asyncio.wait(tasks, return_when=asyncio.FIRST_COMPLETED)
+        finally:
+            for task in tasks:
+                task.cancel()
+            await asyncio.gather(*tasks, return_exceptions=True)
+        for task in done:
+            task.result()
+
+    async def _reader(self, ws):
+        async for raw in ws:
+            try:
+                self.events.put(('message', json.loads(raw)))
+            except json.JSONDecodeError:
+                self.events.put(('error', "JSON inválido recebido do servidor"))
+
+    async def _writer(self, ws):
+        while True:
+            # Mensagem que falhou na conexão anterior é reenviada primeiro
+            if self._pending is None:
+                self._pending = await self._outgoing.get()
+            await ws.send(json.dumps(self._pending))
+            self._pending = None
@@ -0,0 +1,70 @@
+import json
+import os
+import re
+from pathlib import Path
+
+DEFAULT_CACHE_DIR = Path(os.environ.get(
+    'QUIZ_CACHE_DIR', Path.home() / '.quiz_game' / 'questions'))
+
+# Versão = 16 dígitos hex (ver questions_version no servidor); código da sala
+# segue a rota ws/quiz/<código>/. Nada fora disso vira caminho de arquivo.
+VERSION_RE = re.compile(r'[0-9a-f]{16}')
+QUIZ_CODE_RE = re.compile(r'\w+')
+
+
+class QuestionCache:
+    """Cache em disco das questões, por código da sala e versão do conteúdo."""
+
+    def __init__(self, cache_dir=DEFAULT_CACHE_DIR):
+        self.cache_dir = Path(cache_dir)
+
+    def _room_dir(self, quiz_code):
+        if not isinstance(quiz_code, str) or not QUIZ_CODE_RE.fullmatch(quiz_code):
+            return None
+        return self.cache_dir / quiz_code
+
+    def _path(self, quiz_code, version):
+        room_dir = self._room_dir(quiz_code)
+        if room_dir is None or not isinstance(version, str) or not VERSION_RE.fullmatch(version):
+            return None
+        return room_dir / f'{version}.json'
+
+    def latest_version(self, quiz_code):
+        # Versão mais recente gravada para a sala, enviada no join
+        room_dir = self._room_dir(quiz_code)
+        if room_dir is None:
+            return None
+        try:
+            versions = [p.stem for p in room_dir.glob('*.json') if VERSION_RE.fullmatch(p.stem)]
+        except OSError:
+            return None
+        # store() mantém só uma versão por sala
+        return versions[0] if versions else None
+
+    def load(self, quiz_code, version):
+        path = self._path(quiz_code, version)
+        if path is None:
+            return None
+        try:
+            with open(path, encoding='utf-8') as f:
+                return json.load(f)
+        except (OSError, json.JSONDecodeError):
+            return None
+
+    def store(self, quiz_code, version, questions):
+        path = self._path(quiz_code, version)
+        if path is None:
+            return
+        try:
+            path.parent.mkdir(parents=True, exist_ok=True)
+            # Escrita atômica: nunca deixa um arquivo pela metade no cache
+            tmp = path.with_suffix('.json.tmp')
+            with open(tmp, 'w', encoding='utf-8') as f:
+                json.dump(questions, f, ensure_ascii=False)
+            os.replace(tmp, path)
+            # Só a versão mais recente da sala fica em disco
+            for old in path.parent.glob('*.json'):
+                if old != path:
+                    old.unlink()
+        except OSError as e:
+            print(f"Erro ao gravar cache de questões: {e}")
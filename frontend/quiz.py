@@ -1,20 +1,23 @@
 import tkinter as tk
 from tkinter import ttk, messagebox
-import json
-import websocket
-import threading
-import time
+import sys
+from network import QuizConnection, DEFAULT_SERVER_URL
+from question_cache import QuestionCache
 
 class QuizClient:
-    def __init__(self, root):
+    def __init__(self, root, server_url=DEFAULT_SERVER_URL):
         self.root = root
+        self.server_url = server_url
         self.root.title("Quiz Game - Cliente")
         self.root.geometry("800x600")
         
-        self.ws = None
+        self.connection = None
+        self.connected_once = False
         self.quiz_code = None
         self.username = None
         self.current_question = None
+        self.score = 0
+        self.question_cache = QuestionCache()
         
         self.setup_styles()
         self.create_main_frame()
@@ -72,58 +75,112 @@ class QuizClient:
             messagebox.showerror("Erro", "Digite seu nome!")
             return
         
-        try:
-            # Conectar ao WebSocket
-            self.ws = websocket.WebSocketApp(
-                f"ws://192.168.1.101:8000/ws/quiz/{self.quiz_code}/",
-                on_open=self.on_ws_open,
-                on_message=self.on_ws_message,
-                on_error=self.on_ws_error,
-                on_close=self.on_ws_close
-            )
-            
-            # Executar em thread separada
-            self.ws_thread = threading.Thread(target=self.ws.run_forever)
-            self.ws_thread.daemon = True
-            self.ws_thread.start()
-            
-            # Mostrar loading
-            self.show_loading_screen("Conectando à sala...")
-            
-        except Exception as e:
-            messagebox.showerror("Erro", f"Erro ao conectar: {e}")
+        # A rede roda num loop asyncio próprio; a UI só conversa com ela por filas
+        self.connection = QuizConnection(
+            self.quiz_code,
+            server_url=self.server_url,
+            on_connect=self.build_connect_messages
+        )
+        self.connected_once = False
+        self.connection.start()
+        self.show_loading_screen("Conectando à sala...")
+        self.root.after(50, self.process_network_events, self.connection)
 
-    def on_ws_open(self, ws):
-        # Enviar mensagem de join após conectar
-        join_message = {
+    def build_connect_messages(self):
+        # Reenviado a cada reconexão para o servidor reconhecer o jogador
+        # Versão das questões em cache: o servidor omite o payload se for a mesma
+        return [{
             'action': 'join',
-            'username': self.username
-        }
-        ws.send(json.dumps(join_message))
-        
-        # Atualizar UI na thread principal
-        self.root.after(0, self.show_lobby_screen)
+            'username': self.username,
+            'questions_version': self.question_cache.latest_version(self.quiz_code)
+        }]
+
+    def process_network_events(self, connection):
+        # Cada laço de leitura pertence a uma conexão; ao sair da sala ou
+        # reconectar em outra, o laço antigo para sozinho
+        if connection is not self.connection:
+            return
+        try:
+            for event, data in connection.poll():
+                try:
+                    if not self.handle_network_event(connection, event, data):
+                        return
+                except Exception:
+                    # Um handler com erro não derruba o processamento das próximas mensagens
+                    self.root.report_callback_exception(*sys.exc_info())
+        finally:
+            if connection is self.connection:
+                self.root.after(50, self.process_network_events, connection)
+
+    def handle_network_event(self, connection, event, data):
+        if event == 'open':
+            self.on_ws_open()
+        elif event == 'message':
+            self.on_ws_message(data)
+        elif event == 'reconnecting':
+            self.root.title("Quiz Game - Cliente (reconectando...)")
+        elif event == 'error':
+            if not self.connected_once:
+                self.on_ws_error(data)
+                return False
+            self.root.title(f"Quiz Game - Cliente (erro de conexão: {data})")
+        elif event == 'closed':
+            self.on_ws_close()
+            return False
+        return True
 
-    def on_ws_message(self, ws, message):
-        data = json.loads(message)
+    def on_ws_open(self):
+        self.root.title("Quiz Game - Cliente")
+        if not self.connected_once:
+            self.connected_once = True
+            self.show_lobby_screen()
+
+    def on_ws_message(self, data):
         message_type = data.get('type')
         
         print(f"Mensagem recebida: {data}")  # Debug
         
         if message_type == 'player_joined':
-            self.root.after(0, lambda: self.update_players_list(data['players']))
+            self.update_players_list(data['players'])
         elif message_type == 'quiz_started':
-            self.root.after(0, lambda: self.show_question_screen(data['questions']))
+            self.on_quiz_started(data)
         elif message_type == 'answer_result':
-            self.root.after(0, lambda: self.show_answer_result(data))
+            self.show_answer_result(data)
+        elif message_type == 'round_scored':
+            self.on_round_scored(data)
         elif message_type == 'error':
-            self.root.after(0, lambda: messagebox.showerror("Erro", data['message']))
+            messagebox.showerror("Erro", data['message'])
 
-    def on_ws_error(self, ws, error):
-        self.root.after(0, lambda: messagebox.showerror("Erro WebSocket", str(error)))
+    def on_quiz_started(self, data):
+        version = data.get('version')
+        questions = data.get('questions')
+        if questions is None:
+            questions = self.question_cache.load(self.quiz_code, version)
+            if questions is None:
+                # Cache perdido: pedir o conjunto completo só para este cliente
+                self.connection.send({'action': 'get_questions'})
+                return
+        elif version:
+            self.question_cache.store(self.quiz_code, version, questions)
+        self.show_question_screen(questions)
 
-    def on_ws_close(self, ws, close_status_code, close_msg):
-        self.root.after(0, lambda: messagebox.showinfo("Conexão", "Desconectado do servidor"))
+    def on_round_scored(self, data):
+        self.score = data['score']
+        # A última rodada pode fechar depois que a tela final já apareceu
+        label = getattr(self, 'final_score_label', None)
+        if label is not None and label.winfo_exists():
+            label.config(text=f"Pontuação: {self.score}")
+
+    def on_ws_error(self, error):
+        # Falha antes da primeira conexão (ex.: URL errada): não insiste
+        self.connection.close()
+        self.connection = None
+        messagebox.showerror("Erro WebSocket", f"Não foi possível conectar a {self.server_url}: {error}")
+        self.show_connection_screen()
+
+    def on_ws_close(self):
+        self.connection = None
+        messagebox.showinfo("Conexão", "Desconectado do servidor")
 
     def show_loading_screen(self, message):
         self.clear_frame()
@@ -170,6 +227,11 @@ class QuizClient:
         leave_btn.grid(row=0, column=1, padx=10)
 
     def update_players_list(self, players):
+        # A lista só existe no lobby; fora dele (ex.: join de quem reconectou) não há o que atualizar
+        players_tree = getattr(self, 'players_tree', None)
+        if players_tree is None or not players_tree.winfo_exists():
+            return
+        
         # Limpar lista atual
         for item in self.players_tree.get_children():
             self.players_tree.delete(item)
@@ -182,7 +244,7 @@ class QuizClient:
         start_message = {
             'action': 'start_quiz'
         }
-        self.ws.send(json.dumps(start_message))
+        self.connection.send(start_message)
 
     def show_question_screen(self, questions):
         self.clear_frame()
@@ -225,7 +287,7 @@ class QuizClient:
             'question_id': self.current_question['id'],
             'answer_id': answer['id']
         }
-        self.ws.send(json.dumps(answer_message))
+        self.connection.send(answer_message)
 
     def show_answer_result(self, data):
         result_window = tk.Toplevel(self.root)
@@ -236,7 +298,7 @@ class QuizClient:
         
         if data['is_correct']:
             ttk.Label(result_window, text="✅ Resposta Correta!", style='Title.TLabel').pack(pady=20)
-            ttk.Label(result_window, text="+10 pontos!").pack(pady=5)
+            ttk.Label(result_window, text="Pontos somados ao fim da rodada").pack(pady=5)
         else:
             ttk.Label(result_window, text="❌ Resposta Incorreta", style='Title.TLabel').pack(pady=20)
         
@@ -257,14 +319,17 @@ class QuizClient:
         self.clear_frame()
         ttk.Label(self.main_frame, text="🎉 Quiz Concluído!", style='Title.TLabel').grid(row=0, column=0, pady=20)
         ttk.Label(self.main_frame, text="Obrigado por jogar!").grid(row=1, column=0, pady=10)
+        self.final_score_label = ttk.Label(self.main_frame, text=f"Pontuação: {self.score}")
+        self.final_score_label.grid(row=2, column=0, pady=10)
         
         back_btn = ttk.Button(self.main_frame, text="Voltar ao Início", 
                             command=self.show_connection_screen, style='Button.TButton')
-        back_btn.grid(row=2, column=0, pady=20)
+        back_btn.grid(row=3, column=0, pady=20)
 
     def leave_room(self):
-        if self.ws:
-            self.ws.close()
+        if self.connection:
+            self.connection.close()
+            self.connection = None
         self.show_connection_screen()
 
     def clear_frame(self):
@@ -272,8 +337,10 @@ class QuizClient:
             widget.destroy()
 
 def main():
+    # URL do servidor: argumento da linha de comando ou QUIZ_SERVER_URL
+    server_url = sys.argv[1] if len(sys.argv) > 1 else DEFAULT_SERVER_URL
     root = tk.Tk()
-    app = QuizClient(root)
+    app = QuizClient(root, server_url)
     root.mainloop()
 
 if __name__ == "__main__":
@@ -0,0 +1,124 @@
+import asyncio
+import json
+import queue
+import socket
+import threading
+import time
+import unittest
+
+import websockets
+
+from network import QuizConnection
+
+
+def free_port():
+    with socket.socket() as s:
+        s.bind(('127.0.0.1', 0))
+        return s.getsockname()[1]
+
+
+class EchoServer:
+    """Servidor local que registra as mensagens e responde com um eco."""
+
+    def __init__(self, close_after=None):
+        self.port = free_port()
+        self.received = queue.Queue()
+        self.close_after = close_after
+        self._ready = threading.Event()
+        self._loop = None
+        self._stop = None
+        self._thread = threading.Thread(target=self._run, daemon=True)
+
+    def __enter__(self):
+        self._thread.start()
+        self._ready.wait(5)
+        return self
+
+    def __exit__(self, *exc):
+        self._loop.call_soon_threadsafe(self._stop.set)
+        self._thread.join(5)
+
+    @property
+    def url(self):
+        return f'ws://127.0.0.1:{self.port}'
+
+    def _run(self):
+        async def handler(ws):
+            count = 0
+            async for raw in ws:
+                message = json.loads(raw)
+                self.received.put((ws.request.path, message))
+                await ws.send(json.dumps({'type': 'echo', 'message': message}))
+                count += 1
+                if self.close_after and count >= self.close_after:
+                    await ws.close()
+
+        async def main():
+            self._loop = asyncio.get_running_loop()
+            self._stop = asyncio.Event()
+            async with websockets.serve(handler, '127.0.0.1', self.port):
+                self._ready.set()
+                await self._stop.wait()
+
+        asyncio.run(main())
+
+
+def wait_for_event(connection, kind, timeout=5):
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        try:
+            event, data = connection.events.get(timeout=0.1)
+        except queue.Empty:
+            continue
+        if event == kind:
+            return data
+    raise AssertionError(f"evento {kind!r} não recebido")
+
+
+class QuizConnectionTests(unittest.TestCase):
+    def test_sends_join_on_connect_and_queued_messages(self):
+        with EchoServer() as server:
+            connection = QuizConnection('ABC', server.url,
+                                        on_connect=lambda: [{'action': 'join', 'username': 'ana'}])
+            connection.start()
+            connection.send({'action': 'start_quiz'})
+            try:
+                wait_for_event(connection, 'open')
+                path, first = server.received.get(timeout=5)
+                _, second = server.received.get(timeout=5)
+                self.assertEqual(path, '/ws/quiz/ABC/')
+                self.assertEqual(first, {'action': 'join', 'username': 'ana'})
+                self.assertEqual(second, {'action': 'start_quiz'})
+                echo = wait_for_event(connection, 'message')
+                self.assertEqual(echo['type'], 'echo')
+            finally:
+                connection.close()
+                connection.join(5)
+
+    def test_reconnects_and_replays_join(self):
+        with EchoServer(close_after=1) as server:
+            connection = QuizConnection('ABC', server.url, min_backoff=0.05,
+                                        on_connect=lambda: [{'action': 'join', 'username': 'ana'}])
+            connection.start()
+            try:
+                wait_for_event(connection, 'open')
+                wait_for_event(connection, 'reconnecting')
+                wait_for_event(connection, 'open')
+                joins = [server.received.get(timeout=5)[1] for _ in range(2)]
+                self.assertEqual(joins, [{'action': 'join', 'username': 'ana'}] * 2)
+            finally:
+                connection.close()
+                connection.join(5)
+
+    def test_reports_error_and_closes(self):
+        connection = QuizConnection('ABC', f'ws://127.0.0.1:{free_port()}', min_backoff=0.05)
+        connection.start()
+        wait_for_event(connection, 'error')
+        connection.close()
+        connection.join(5)
+        self.assertFalse(connection._thread.is_alive())
+        self.assertIn(('closed', None), connection.poll())
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,39 @@
+import tempfile
+import unittest
+from pathlib import Path
+
+from question_cache import QuestionCache
+
+QUESTIONS = [{'id': 1, 'text': 'Capital do Brasil?', 'answers': [{'id': 2, 'text': 'Brasília'}]}]
+
+
+class QuestionCacheTests(unittest.TestCase):
+    def setUp(self):
+        tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(tmp.cleanup)
+        self.cache_dir = Path(tmp.name)
+        self.cache = QuestionCache(self.cache_dir)
+
+    def test_store_and_load(self):
+        self.cache.store('ABC', '0123456789abcdef', QUESTIONS)
+        self.assertEqual(self.cache.load('ABC', '0123456789abcdef'), QUESTIONS)
+        self.assertEqual(self.cache.latest_version('ABC'), '0123456789abcdef')
+        self.assertIsNone(self.cache.latest_version('XYZ'))
+
+    def test_keeps_only_latest_version(self):
+        self.cache.store('ABC', '0' * 16, QUESTIONS)
+        self.cache.store('ABC', 'f' * 16, QUESTIONS)
+        self.assertEqual([p.name for p in (self.cache_dir / 'ABC').iterdir()], ['f' * 16 + '.json'])
+        self.assertEqual(self.cache.latest_version('ABC'), 'f' * 16)
+        self.assertIsNone(self.cache.load('ABC', '0' * 16))
+
+    def test_rejects_invalid_version_and_code(self):
+        for quiz_code, version in [('ABC', '../../etc/passwd'), ('ABC', 'abc'), ('ABC', None),
+                                   ('../ABC', '0' * 16), ('ABC', '0123456789ABCDEF')]:
+            self.cache.store(quiz_code, version, QUESTIONS)
+            self.assertIsNone(self.cache.load(quiz_code, version))
+        self.assertEqual(list(self.cache_dir.iterdir()), [])
+
+
+if __name__ == '__main__':
+    unittest.main()
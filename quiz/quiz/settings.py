@@ -1,3 +1,4 @@
+import os
 from pathlib import Path
 
 BASE_DIR = Path(__file__).resolve().parent.parent
@@ -68,4 +69,12 @@ CHANNEL_LAYERS = {
     },
 }
 
-CSRF_TRUSTED_ORIGINS = ['http://localhost:8000', 'http://127.0.0.1:8000']
\ No newline at end of file
+CSRF_TRUSTED_ORIGINS = ['http://localhost:8000', 'http://127.0.0.1:8000']
+
+# Snapshot compilado do banco de questões (manage.py build_question_snapshot)
+QUESTION_SNAPSHOT_PATH = BASE_DIR / 'question_bank.snap'
+
+# Saída dos perfis das salas (ação no admin ou kill -USR2 <pid>)
+PROFILE_DIR = BASE_DIR / 'profiles'
+# Liga o handler de SIGUSR2; defina QUIZ_PROFILE_SIGNAL=1 só no processo do servidor
+PROFILE_SIGNAL_ENABLED = os.environ.get('QUIZ_PROFILE_SIGNAL') == '1'
\ No newline at end of file
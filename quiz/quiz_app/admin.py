@@ -1,10 +1,18 @@
 from django.contrib import admin
 from .models import Quiz, Player, Question, Answer
+from .profiling import DEFAULT_DURATION, start_profiling
 
 @admin.register(Quiz)
 class QuizAdmin(admin.ModelAdmin):
     list_display = ['code', 'title', 'created_at', 'is_active']
     search_fields = ['code', 'title']
+    actions = ['profile_rooms']
+
+    @admin.action(description=f"Perfilar salas selecionadas ({DEFAULT_DURATION}s)")
+    def profile_rooms(self, request, queryset):
+        for quiz in queryset:
+            start_profiling(room=quiz.code)
+        self.message_user(request, f"Perfil iniciado para {queryset.count()} sala(s)")
 
 @admin.register(Player)
 class PlayerAdmin(admin.ModelAdmin):
@@ -13,8 +21,8 @@ class PlayerAdmin(admin.ModelAdmin):
 
 @admin.register(Question)
 class QuestionAdmin(admin.ModelAdmin):
-    list_display = ['text', 'quiz', 'order', 'time_limit']
-    list_filter = ['quiz']
+    list_display = ['text', 'category', 'order', 'time_limit', 'points']
+    list_filter = ['category']
 
 @admin.register(Answer)
 class AnswerAdmin(admin.ModelAdmin):
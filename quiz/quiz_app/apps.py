@@ -2,4 +2,12 @@ from django.apps import AppConfig
 
 class QuizAppConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
-    name = 'quiz_app'
\ No newline at end of file
+    name = 'quiz_app'
+
+    def ready(self):
+        from django.conf import settings
+        from . import signals  # noqa: F401
+        # Opt-in: só processos de servidor devem ligar o handler (não migrate, test...)
+        if getattr(settings, 'PROFILE_SIGNAL_ENABLED', False):
+            from .profiling import install_signal_handler
+            install_signal_handler()
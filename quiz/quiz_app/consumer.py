@@ -1,8 +1,54 @@
+import asyncio
+import hashlib
 import json
+import logging
 import uuid
+from django.db import transaction
+from django.db.models import Case, F, Prefetch, Value, When
 from channels.generic.websocket import AsyncWebsocketConsumer
 from channels.db import database_sync_to_async
-from .models import Quiz, Player, Question, Answer
+from .models import Quiz, Player, Question, Answer, QuizThemeSelection
+from .scoring import RoomScoring, RoundAnswers
+from .snapshot import get_snapshot
+
+logger = logging.getLogger(__name__)
+
+# Estado de pontuação por sala (o channel layer em memória roda num só processo)
+ROOM_SCORING = {}
+# Tolerância extra, além do time_limit, antes de fechar uma rodada incompleta
+ROUND_GRACE_SECONDS = 5
+SCORE_UPDATE_BATCH = 500
+# Tempo que o cliente mostra o resultado antes de exibir a próxima questão
+RESULT_DISPLAY_SECONDS = 3
+LEADERBOARD_SIZE = 10
+# Tempo que uma sala vazia mantém rodadas e sequências (quedas rápidas, reconexões)
+ROOM_IDLE_SECONDS = 300
+
+# Referências às tarefas em segundo plano (timers de rodada e de sala vazia)
+BACKGROUND_TASKS = set()
+
+def run_in_background(coro):
+    task = asyncio.ensure_future(coro)
+    BACKGROUND_TASKS.add(task)
+    task.add_done_callback(_background_task_done)
+    return task
+
+def _background_task_done(task):
+    BACKGROUND_TASKS.discard(task)
+    if not task.cancelled() and task.exception() is not None:
+        logger.error("Erro em tarefa da sala", exc_info=task.exception())
+
+def discard_room_scoring(room_group_name):
+    scoring = ROOM_SCORING.pop(room_group_name, None)
+    if scoring is not None:
+        for round_answers in scoring.rounds.values():
+            if round_answers.timer:
+                round_answers.timer.cancel()
+
+def questions_version(questions):
+    # Hash do conteúdo: muda sempre que qualquer questão ou resposta mudar
+    payload = json.dumps(questions, sort_keys=True, separators=(',', ':'))
+    return hashlib.sha256(payload.encode('utf-8')).hexdigest()[:16]
 
 class QuizConsumer(AsyncWebsocketConsumer):
     def __init__(self, *args, **kwargs):
@@ -11,6 +57,8 @@ class QuizConsumer(AsyncWebsocketConsumer):
         self.quiz = None
         self.player = None
         self.room_group_name = None
+        self.client_questions_version = None
+        self.question_started_at = None
 
     async def connect(self):
         self.quiz_code = self.scope['url_route']['kwargs']['quiz_code']
@@ -29,6 +77,14 @@ class QuizConsumer(AsyncWebsocketConsumer):
     async def disconnect(self, close_code):
         if self.player:
             await self.set_player_offline()
+            # Sala vazia: espera um tempo antes de descartar a pontuação,
+            # para quedas rápidas e reconexões não perderem nada
+            scoring = ROOM_SCORING.get(self.room_group_name)
+            if scoring is not None and await self.count_online_players() == 0:
+                asyncio.get_running_loop().call_later(
+                    ROOM_IDLE_SECONDS,
+                    lambda: run_in_background(self.discard_idle_room(scoring))
+                )
             
         if self.room_group_name:
             await self.channel_layer.group_discard(
@@ -47,6 +103,8 @@ class QuizConsumer(AsyncWebsocketConsumer):
                 await self.handle_start_quiz()
             elif action == 'answer':
                 await self.handle_answer(data)
+            elif action == 'get_questions':
+                await self.handle_get_questions()
                 
         except json.JSONDecodeError:
             await self.send_error("JSON inválido")
@@ -57,6 +115,9 @@ class QuizConsumer(AsyncWebsocketConsumer):
             await self.send_error("Nome de usuário é obrigatório")
             return
         
+        # Versão das questões que o cliente já tem em cache
+        self.client_questions_version = data.get('questions_version')
+        
         self.player = await self.create_player(username)
         if not self.player:
             await self.send_error("Erro ao entrar na sala")
@@ -78,27 +139,133 @@ class QuizConsumer(AsyncWebsocketConsumer):
 
     async def handle_start_quiz(self):
         questions = await self.get_quiz_questions()
+        # Novo jogo: a pontuação da sala recomeça do zero
+        discard_room_scoring(self.room_group_name)
         await self.channel_layer.group_send(
             self.room_group_name,
             {
                 'type': 'quiz_started',
+                'version': questions_version(questions),
                 'questions': questions
             }
         )
 
+    async def handle_get_questions(self):
+        # Cliente sem a versão em cache pede o conjunto completo
+        questions = await self.get_quiz_questions()
+        self.client_questions_version = questions_version(questions)
+        await self.send(text_data=json.dumps({
+            'type': 'quiz_started',
+            'version': self.client_questions_version,
+            'questions': questions
+        }))
+        self.question_started_at = asyncio.get_running_loop().time()
+
     async def handle_answer(self, data):
+        if not self.player:
+            await self.send_error("Entre na sala antes de responder")
+            return
+        
         question_id = data.get('question_id')
         answer_id = data.get('answer_id')
+        if not all(isinstance(value, int) and not isinstance(value, bool)
+                   for value in (question_id, answer_id)):
+            await self.send_error("Resposta inválida")
+            return
+        
+        scoring = ROOM_SCORING.setdefault(self.room_group_name, RoomScoring())
+        scoring.channels[self.player.id] = self.channel_name
         
-        is_correct = await self.check_answer(question_id, answer_id)
-        if is_correct:
-            await self.update_player_score(10)
+        # Rodada já pontuada: responde, mas não pontua de novo
+        closed_correct_ids = scoring.closed_rounds.get(question_id)
+        if closed_correct_ids is not None:
+            await self.send_answer_result(answer_id in closed_correct_ids)
+            return
+        
+        round_answers = scoring.rounds.get(question_id)
+        if round_answers is None:
+            round_info = await self.open_round(question_id)
+            if round_info is None:
+                await self.send_error("Questão inválida")
+                return
+            # Outro jogador pode ter aberto ou fechado a rodada durante o await
+            closed_correct_ids = scoring.closed_rounds.get(question_id)
+            if closed_correct_ids is not None:
+                await self.send_answer_result(answer_id in closed_correct_ids)
+                return
+            round_answers = scoring.rounds.get(question_id)
+            if round_answers is None:
+                round_answers = self.start_round(scoring, *round_info)
+        
+        # O tempo de resposta é medido no servidor, a partir de quando a
+        # questão foi exibida para este jogador (sem referência, não há bônus)
+        if self.question_started_at is None:
+            response_time = round_answers.time_limit
+        else:
+            response_time = asyncio.get_running_loop().time() - self.question_started_at
+        round_answers.add(scoring.player_index(self.player.id), answer_id, response_time)
         
+        # Os pontos só são calculados no fechamento da rodada
+        await self.send_answer_result(answer_id in round_answers.correct_answer_ids)
+        
+        if round_answers.is_complete():
+            await self.close_round(scoring, round_answers)
+
+    def start_round(self, scoring, question_id, points, time_limit, correct_ids, online_ids):
+        round_answers = RoundAnswers(
+            question_id, points, time_limit, correct_ids,
+            [scoring.player_index(player_id) for player_id in online_ids]
+        )
+        scoring.rounds[question_id] = round_answers
+        # Um único timer por rodada, criado junto com ela
+        round_answers.timer = asyncio.get_running_loop().call_later(
+            time_limit + ROUND_GRACE_SECONDS,
+            lambda: run_in_background(self.close_round(scoring, round_answers))
+        )
+        return round_answers
+
+    async def send_answer_result(self, is_correct):
         await self.send(text_data=json.dumps({
             'type': 'answer_result',
             'is_correct': is_correct,
-            'score': self.player.score if self.player else 0
+            'score': self.player.score
         }))
+        # O cliente mostra o resultado e depois a próxima questão
+        self.question_started_at = asyncio.get_running_loop().time() + RESULT_DISPLAY_SECONDS
+
+    async def discard_idle_room(self, scoring):
+        if ROOM_SCORING.get(self.room_group_name) is not scoring:
+            return
+        if await self.count_online_players():
+            return
+        # Pontua o que ficou aberto antes de descartar o estado da sala
+        for round_answers in list(scoring.rounds.values()):
+            await self.close_round(scoring, round_answers)
+        if ROOM_SCORING.get(self.room_group_name) is scoring:
+            discard_room_scoring(self.room_group_name)
+
+    async def close_round(self, scoring, round_answers):
+        if not scoring.close(round_answers):
+            return
+        if round_answers.timer:
+            round_answers.timer.cancel()
+        if not len(round_answers):
+            return
+        
+        player_ids, deltas = scoring.score(round_answers)
+        results, leaderboard = await self.apply_score_deltas(player_ids.tolist(), deltas.tolist())
+        # Cada jogador recebe só o próprio resultado e o top da sala
+        for player_id, score, delta in results:
+            channel_name = scoring.channels.get(player_id)
+            if channel_name is None:
+                continue
+            await self.channel_layer.send(channel_name, {
+                'type': 'round_scored',
+                'question_id': round_answers.question_id,
+                'score': score,
+                'delta': delta,
+                'leaderboard': leaderboard
+            })
 
     async def player_joined(self, event):
         await self.send(text_data=json.dumps({
@@ -108,9 +275,26 @@ class QuizConsumer(AsyncWebsocketConsumer):
         }))
 
     async def quiz_started(self, event):
-        await self.send(text_data=json.dumps({
+        message = {
             'type': 'quiz_started',
-            'questions': event['questions']
+            'version': event['version']
+        }
+        # Só envia as questões se o cliente ainda não tiver essa versão
+        if event['version'] != self.client_questions_version:
+            message['questions'] = event['questions']
+            self.client_questions_version = event['version']
+        await self.send(text_data=json.dumps(message))
+        self.question_started_at = asyncio.get_running_loop().time()
+
+    async def round_scored(self, event):
+        if self.player:
+            self.player.score = event['score']
+        await self.send(text_data=json.dumps({
+            'type': 'round_scored',
+            'question_id': event['question_id'],
+            'score': event['score'],
+            'delta': event['delta'],
+            'leaderboard': event['leaderboard']
         }))
 
     # ✅ FUNÇÃO QUE FALTAVA - get_or_create_quiz
@@ -137,7 +321,8 @@ class QuizConsumer(AsyncWebsocketConsumer):
             if not created:
                 player.is_online = True
                 player.session_id = str(uuid.uuid4())
-                player.save()
+                # Não regrava score: a pontuação é somada direto no banco
+                player.save(update_fields=['is_online', 'session_id'])
             return player
         except Exception as e:
             print(f"Erro ao criar player: {e}")
@@ -145,9 +330,12 @@ class QuizConsumer(AsyncWebsocketConsumer):
 
     @database_sync_to_async
     def set_player_offline(self):
+        # Só marca offline se a sessão ainda for desta conexão: o jogador
+        # pode ter reconectado por outra antes desta cair
         if self.player:
-            self.player.is_online = False
-            self.player.save()
+            Player.objects.filter(
+                id=self.player.id, session_id=self.player.session_id
+            ).update(is_online=False)
 
     @database_sync_to_async
     def get_room_players(self):
@@ -162,10 +350,23 @@ class QuizConsumer(AsyncWebsocketConsumer):
 
     @database_sync_to_async
     def get_quiz_questions(self):
-        questions = Question.objects.filter(quiz=self.quiz)
+        # Questões dos temas escolhidos para a sala, na mesma ordem do snapshot
+        theme_ids = sorted(set(QuizThemeSelection.objects.filter(
+            quiz=self.quiz
+        ).values_list('theme_id', flat=True)))
+
+        # Com snapshot gerado, as questões vêm do arquivo mapeado em memória
+        snapshot = get_snapshot()
+        if snapshot is not None:
+            return snapshot.questions_for_themes(theme_ids)
+
+        questions = Question.objects.filter(
+            category_id__in=theme_ids
+        ).order_by('category_id', 'order', 'id').prefetch_related(
+            Prefetch('answers', queryset=Answer.objects.order_by('id'))
+        )
         result = []
         for question in questions:
-            answers = Answer.objects.filter(question=question)
             result.append({
                 'id': question.id,
                 'text': question.text,
@@ -176,24 +377,59 @@ class QuizConsumer(AsyncWebsocketConsumer):
                         'text': answer.text,
                         'is_correct': answer.is_correct
                     }
-                    for answer in answers
+                    for answer in question.answers.all()
                 ]
             })
         return result
 
     @database_sync_to_async
-    def check_answer(self, question_id, answer_id):
+    def open_round(self, question_id):
         try:
-            answer = Answer.objects.get(id=answer_id, question_id=question_id)
-            return answer.is_correct
-        except Answer.DoesNotExist:
-            return False
+            # Só questões dos temas escolhidos para esta sala
+            question = Question.objects.filter(
+                category__quiz_selections__quiz=self.quiz
+            ).distinct().get(id=question_id)
+        except (Question.DoesNotExist, ValueError, TypeError):
+            return None
+        correct_ids = list(Answer.objects.filter(
+            question=question, is_correct=True
+        ).values_list('id', flat=True))
+        online_ids = list(Player.objects.filter(
+            quiz=self.quiz, is_online=True
+        ).values_list('id', flat=True))
+        return question.id, question.points, question.time_limit, correct_ids, online_ids
 
     @database_sync_to_async
-    def update_player_score(self, points):
-        if self.player:
-            self.player.score += points
-            self.player.save()
+    def count_online_players(self):
+        return Player.objects.filter(quiz=self.quiz, is_online=True).count()
+
+    @database_sync_to_async
+    def apply_score_deltas(self, player_ids, deltas):
+        # Um UPDATE com CASE por lote, em vez de um save() por jogador
+        changed = [(player_id, delta) for player_id, delta in zip(player_ids, deltas) if delta]
+        with transaction.atomic():
+            for start in range(0, len(changed), SCORE_UPDATE_BATCH):
+                batch = changed[start:start + SCORE_UPDATE_BATCH]
+                Player.objects.filter(id__in=[player_id for player_id, _ in batch]).update(
+                    score=F('score') + Case(
+                        *[When(id=player_id, then=Value(delta)) for player_id, delta in batch],
+                        default=Value(0)
+                    )
+                )
+        delta_by_player = dict(zip(player_ids, deltas))
+        results = [
+            (player_id, score, delta_by_player[player_id])
+            for player_id, score in Player.objects.filter(
+                id__in=player_ids
+            ).values_list('id', 'score')
+        ]
+        leaderboard = [
+            {'username': username, 'score': score}
+            for username, score in Player.objects.filter(
+                quiz=self.quiz
+            ).order_by('-score', 'username').values_list('username', 'score')[:LEADERBOARD_SIZE]
+        ]
+        return results, leaderboard
 
     async def send_error(self, message):
         await self.send(text_data=json.dumps({
@@ -0,0 +1,73 @@
+import random
+import time
+
+from django.core.management.base import BaseCommand
+
+from quiz_app.scoring import RoomScoring, RoundAnswers
+
+
+def score_per_message(streaks, player_id, answer_id, response_time, points, time_limit, correct_ids):
+    # Mesmas regras padrão do motor, avaliadas uma resposta por vez
+    if answer_id not in correct_ids:
+        streaks[player_id] = 0
+        return 0
+    streaks[player_id] = streaks.get(player_id, 0) + 1
+    delta = points + points * 0.5 * (1.0 - min(response_time, time_limit) / time_limit)
+    return round(delta * min(1.0 + 0.1 * (streaks[player_id] - 1), 2.0))
+
+
+class Command(BaseCommand):
+    help = "Compara a pontuação por mensagem com o motor vetorizado de fim de rodada"
+
+    def add_arguments(self, parser):
+        parser.add_argument('--players', type=int, default=10000)
+        parser.add_argument('--rounds', type=int, default=20)
+        parser.add_argument('--seed', type=int, default=0)
+
+    def handle(self, *args, **options):
+        rng = random.Random(options['seed'])
+        players = options['players']
+        points, time_limit, correct_ids = 10, 30, {1}
+        rounds = [
+            [(player_id, rng.randint(1, 4), rng.uniform(0, time_limit)) for player_id in range(players)]
+            for _ in range(options['rounds'])
+        ]
+
+        streaks = {}
+        totals_scalar = {}
+        start = time.perf_counter()
+        for answers in rounds:
+            for player_id, answer_id, response_time in answers:
+                delta = score_per_message(streaks, player_id, answer_id, response_time,
+                                          points, time_limit, correct_ids)
+                totals_scalar[player_id] = totals_scalar.get(player_id, 0) + delta
+        scalar_seconds = time.perf_counter() - start
+
+        # A coleta acontece mensagem a mensagem; o cálculo, uma vez por rodada
+        scoring = RoomScoring()
+        totals_vector = {}
+        collect_seconds = score_seconds = 0.0
+        for question_id, answers in enumerate(rounds):
+            start = time.perf_counter()
+            round_answers = RoundAnswers(question_id, points, time_limit, correct_ids)
+            for player_id, answer_id, response_time in answers:
+                round_answers.add(scoring.player_index(player_id), answer_id, response_time)
+            collect_seconds += time.perf_counter() - start
+
+            start = time.perf_counter()
+            player_ids, deltas = scoring.score(round_answers)
+            score_seconds += time.perf_counter() - start
+
+            for player_id, delta in zip(player_ids.tolist(), deltas.tolist()):
+                totals_vector[player_id] = totals_vector.get(player_id, 0) + delta
+
+        answers_total = players * len(rounds)
+        self.stdout.write(f"{answers_total} respostas ({players} jogadores x {len(rounds)} rodadas)")
+        self.stdout.write(f"Por mensagem: {scalar_seconds * 1000:.1f} ms")
+        self.stdout.write(f"Vetorizado:   {(collect_seconds + score_seconds) * 1000:.1f} ms no total "
+                          f"({collect_seconds * 1000:.1f} ms de coleta nas mensagens + "
+                          f"{score_seconds * 1000:.1f} ms no fechamento das rodadas)")
+        if totals_scalar == totals_vector:
+            self.stdout.write(self.style.SUCCESS("Pontuações idênticas"))
+        else:
+            self.stdout.write(self.style.WARNING("Pontuações divergentes"))
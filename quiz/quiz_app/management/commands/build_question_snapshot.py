@@ -0,0 +1,14 @@
+from django.core.management.base import BaseCommand
+
+from quiz_app.snapshot import build_snapshot
+
+
+class Command(BaseCommand):
+    help = "Compila temas, questões, respostas e opções num snapshot binário somente leitura"
+
+    def add_arguments(self, parser):
+        parser.add_argument('--output', help="Caminho do snapshot (padrão: QUESTION_SNAPSHOT_PATH)")
+
+    def handle(self, *args, **options):
+        path = build_snapshot(options['output'])
+        self.stdout.write(self.style.SUCCESS(f"Snapshot gerado em {path}"))
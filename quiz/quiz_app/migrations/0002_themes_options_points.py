@@ -0,0 +1,58 @@
+# Generated by Django 5.2.18 on 2026-10-19 19:45
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('quiz_app', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='Theme',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('name', models.CharField(max_length=100, unique=True, verbose_name='Nome da Categoria/Tema')),
+                ('description', models.TextField(blank=True, null=True)),
+            ],
+        ),
+        migrations.AddField(
+            model_name='question',
+            name='points',
+            field=models.PositiveBigIntegerField(default=10, verbose_name='Pontuação'),
+        ),
+        migrations.CreateModel(
+            name='Option',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('text', models.CharField(max_length=255)),
+                ('is_correct', models.BooleanField(default=False)),
+                ('question', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='options', to='quiz_app.question')),
+            ],
+        ),
+        migrations.CreateModel(
+            name='QuizThemeSelection',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('quiz', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='Selected_themes_set', to='quiz_app.quiz', verbose_name='Quiz Pai')),
+                ('theme', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='quiz_selections', to='quiz_app.theme', verbose_name='Tema Escolhido')),
+            ],
+        ),
+        migrations.AddField(
+            model_name='question',
+            name='category',
+            field=models.ForeignKey(default=1, on_delete=django.db.models.deletion.CASCADE, related_name='questions', to='quiz_app.theme'),
+            preserve_default=False,
+        ),
+        migrations.AlterUniqueTogether(
+            name='question',
+            unique_together={('category', 'order')},
+        ),
+        migrations.RemoveField(
+            model_name='question',
+            name='quiz',
+        ),
+    ]
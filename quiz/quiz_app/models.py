@@ -51,7 +51,7 @@ class Question(models.Model):
     )
     
     class Meta:
-        unique_together = ('quiz', 'order')
+        unique_together = ('category', 'order')
         ordering = ['order']
     
     def __str__(self):
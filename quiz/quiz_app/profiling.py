@@ -0,0 +1,155 @@
+import collections
+import os
+import signal
+import sys
+import threading
+import time
+
+from django.conf import settings
+
+DEFAULT_DURATION = 30
+MAX_DURATION = 300
+SAMPLE_INTERVAL = 0.005
+TOP_N = 25
+
+CONSUMER_FILE = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'consumer.py')
+
+_sessions = {}
+_lock = threading.Lock()
+
+
+def _frame_label(code):
+    name = f"{code.co_name} ({os.path.basename(code.co_filename)}:{code.co_firstlineno})"
+    return name.replace(';', ':')
+
+
+def _frame_room(frame):
+    # Frames do consumer (receive, handlers e helpers de banco) têm `self`
+    # apontando para o QuizConsumer, de onde sai o código da sala
+    code = frame.f_code
+    if code.co_filename != CONSUMER_FILE or not code.co_varnames or code.co_varnames[0] != 'self':
+        return None
+    return getattr(frame.f_locals.get('self'), 'quiz_code', None)
+
+
+class ProfileSession(threading.Thread):
+    """Amostrador de pilhas que roda numa thread própria por uma janela limitada.
+
+    Não instala nenhum hook no código da sala: enquanto nenhuma sessão está
+    ativa, o custo é zero. Com `room`, só conta pilhas que passam por um
+    QuizConsumer dessa sala; sem `room`, amostra todas as threads.
+    """
+
+    def __init__(self, room=None, duration=DEFAULT_DURATION, interval=SAMPLE_INTERVAL):
+        super().__init__(daemon=True, name=f"quiz-profiler-{room or 'global'}")
+        self.room = room
+        self.duration = min(duration, MAX_DURATION)
+        self.interval = interval
+        self.stacks = collections.Counter()
+        self.samples = 0
+        self.output_path = None
+        self._stop_event = threading.Event()
+
+    def stop(self):
+        self._stop_event.set()
+
+    def run(self):
+        try:
+            deadline = time.monotonic() + self.duration
+            own_thread = threading.get_ident()
+            while not self._stop_event.is_set() and time.monotonic() < deadline:
+                for thread_id, frame in sys._current_frames().items():
+                    if thread_id != own_thread:
+                        self._sample(frame)
+                self.samples += 1
+                self._stop_event.wait(self.interval)
+            self.output_path = self.write_results()
+        finally:
+            with _lock:
+                if _sessions.get(self.room) is self:
+                    del _sessions[self.room]
+
+    def _sample(self, frame):
+        labels = []
+        in_room = self.room is None
+        while frame is not None:
+            if not in_room and _frame_room(frame) == self.room:
+                in_room = True
+            labels.append(_frame_label(frame.f_code))
+            frame = frame.f_back
+        if in_room:
+            labels.reverse()
+            self.stacks[';'.join(labels)] += 1
+
+    def summary(self, top_n=TOP_N):
+        own = collections.Counter()
+        total = collections.Counter()
+        for stack, count in self.stacks.items():
+            frames = stack.split(';')
+            own[frames[-1]] += count
+            for label in set(frames):
+                total[label] += count
+
+        stack_samples = sum(self.stacks.values()) or 1
+        lines = [
+            f"Sala: {self.room or 'todas'}",
+            f"Duração: {self.duration}s, {self.samples} amostragens, {sum(self.stacks.values())} pilhas",
+            "",
+            f"Top {top_n} por tempo próprio:",
+        ]
+        lines += [f"{count:8d} {100 * count / stack_samples:6.2f}%  {label}"
+                  for label, count in own.most_common(top_n)]
+        lines += ["", f"Top {top_n} por tempo total (inclusivo):"]
+        lines += [f"{count:8d} {100 * count / stack_samples:6.2f}%  {label}"
+                  for label, count in total.most_common(top_n)]
+        return '\n'.join(lines) + '\n'
+
+    def write_results(self):
+        output_dir = getattr(settings, 'PROFILE_DIR', None) or os.getcwd()
+        os.makedirs(output_dir, exist_ok=True)
+        base = os.path.join(output_dir, f"{time.strftime('%Y%m%d-%H%M%S')}-{self.room or 'global'}")
+
+        # Formato "collapsed" (pilha;separada;por;ponto-e-vírgula contagem),
+        # aceito pelo flamegraph.pl e pelo speedscope
+        with open(f'{base}.collapsed', 'w', encoding='utf-8') as f:
+            for stack, count in self.stacks.most_common():
+                f.write(f'{stack} {count}\n')
+        with open(f'{base}.txt', 'w', encoding='utf-8') as f:
+            f.write(self.summary())
+        return base
+
+
+def start_profiling(room=None, duration=DEFAULT_DURATION):
+    """Inicia uma sessão para a sala (ou global, com room=None).
+
+    Se já houver uma sessão ativa para a mesma sala, ela é retornada.
+    """
+    with _lock:
+        session = _sessions.get(room)
+        if session is None:
+            session = ProfileSession(room, duration)
+            _sessions[room] = session
+            session.start()
+        return session
+
+
+def stop_profiling(room=None):
+    with _lock:
+        session = _sessions.get(room)
+    if session is not None:
+        session.stop()
+    return session
+
+
+def install_signal_handler(signum=getattr(signal, 'SIGUSR2', None)):
+    # `kill -USR2 <pid>` liga a amostragem global por DEFAULT_DURATION segundos
+    if signum is None:
+        return False
+    try:
+        # O handler só dispara uma thread: start_profiling usa um lock que a
+        # thread principal pode estar segurando quando o sinal chega
+        signal.signal(signum, lambda *args: threading.Thread(
+            target=start_profiling, daemon=True).start())
+    except ValueError:
+        return False  # fora da thread principal
+    return True
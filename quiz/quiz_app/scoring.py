@@ -0,0 +1,177 @@
+from array import array
+
+import numpy as np
+
+
+class RoundAnswers:
+    """Respostas de uma questão, guardadas em colunas até o fim da rodada."""
+
+    def __init__(self, question_id, points, time_limit, correct_answer_ids, expected_players=()):
+        self.question_id = question_id
+        self.points = points
+        self.time_limit = time_limit
+        self.correct_answer_ids = frozenset(correct_answer_ids)
+        # Índices dos jogadores online quando a rodada abriu
+        self.expected_players = frozenset(expected_players)
+        self.timer = None
+        # array() cresce sem criar um objeto Python por resposta
+        self.players = array('q')
+        self.answers = array('q')
+        self.response_times = array('d')
+        self._answered = set()
+
+    def __len__(self):
+        return len(self.players)
+
+    def add(self, player_index, answer_id, response_time):
+        if player_index in self._answered:
+            return False
+        self._answered.add(player_index)
+        self.players.append(player_index)
+        self.answers.append(answer_id)
+        self.response_times.append(response_time)
+        return True
+
+    def is_complete(self):
+        return bool(self.expected_players) and self._answered >= self.expected_players
+
+
+class RoundContext:
+    def __init__(self, round_answers, state):
+        self.points = round_answers.points
+        self.time_limit = round_answers.time_limit
+        self.players = np.frombuffer(round_answers.players, dtype=np.int64)
+        self.answers = np.frombuffer(round_answers.answers, dtype=np.int64)
+        # NaN/infinito contam como o tempo todo; o resto é limitado a [0, time_limit]
+        times = np.frombuffer(round_answers.response_times, dtype=np.float64)
+        self.response_times = np.clip(
+            np.nan_to_num(times, nan=self.time_limit, posinf=self.time_limit, neginf=self.time_limit),
+            0.0, self.time_limit
+        )
+        self.expected = np.fromiter(round_answers.expected_players, dtype=np.int64)
+        self.correct = np.isin(
+            self.answers, np.fromiter(round_answers.correct_answer_ids, dtype=np.int64)
+        )
+        self.state = state
+
+
+class ScoringRule:
+    """Regra de pontuação: recebe o contexto da rodada e os deltas parciais
+    (um por resposta) e devolve os novos deltas, sem laços em Python."""
+
+    def apply(self, ctx, deltas):
+        raise NotImplementedError
+
+
+class CorrectAnswerRule(ScoringRule):
+    # Pontuação da questão (Question.points) para quem acertou
+    def apply(self, ctx, deltas):
+        return deltas + ctx.correct * float(ctx.points)
+
+
+class SpeedBonusRule(ScoringRule):
+    # Bônus de até `max_fraction` dos pontos, proporcional ao tempo restante
+    def __init__(self, max_fraction=0.5):
+        self.max_fraction = max_fraction
+
+    def apply(self, ctx, deltas):
+        if ctx.time_limit <= 0:
+            return deltas
+        remaining = 1.0 - ctx.response_times / ctx.time_limit
+        return deltas + ctx.correct * (ctx.points * self.max_fraction * remaining)
+
+
+class StreakMultiplierRule(ScoringRule):
+    # Multiplica os pontos de quem acerta em sequência. Errar zera a sequência,
+    # assim como não responder a uma rodada em que o jogador estava online;
+    # quem não participou da rodada mantém o valor anterior
+    def __init__(self, step=0.1, max_multiplier=2.0):
+        self.step = step
+        self.max_multiplier = max_multiplier
+
+    def apply(self, ctx, deltas):
+        previous = ctx.state.streaks(len(ctx.state))
+        streaks = previous.copy()
+        streaks[ctx.expected] = 0
+        streaks[ctx.players] = np.where(ctx.correct, previous[ctx.players] + 1, 0)
+        ctx.state.set_streaks(streaks)
+
+        current = streaks[ctx.players]
+        multiplier = np.minimum(1.0 + self.step * np.maximum(current - 1, 0), self.max_multiplier)
+        return deltas * multiplier
+
+
+class PartialCreditRule(ScoringRule):
+    # Fração dos pontos para respostas erradas "quase certas": {answer_id: fração}
+    def __init__(self, credits):
+        items = sorted(credits.items())
+        self.answer_ids = np.array([answer_id for answer_id, _ in items], dtype=np.int64)
+        self.fractions = np.array([fraction for _, fraction in items], dtype=np.float64)
+
+    def apply(self, ctx, deltas):
+        if not len(self.answer_ids):
+            return deltas
+        position = np.searchsorted(self.answer_ids, ctx.answers)
+        position = np.minimum(position, len(self.answer_ids) - 1)
+        matched = (self.answer_ids[position] == ctx.answers) & ~ctx.correct
+        return deltas + np.where(matched, self.fractions[position] * ctx.points, 0.0)
+
+
+DEFAULT_RULES = (CorrectAnswerRule(), SpeedBonusRule(), StreakMultiplierRule())
+
+
+class RoomScoring:
+    """Estado de pontuação de uma sala: índices densos dos jogadores,
+    sequências de acertos e as rodadas abertas."""
+
+    def __init__(self, rules=DEFAULT_RULES):
+        self.rules = list(rules)
+        self.rounds = {}
+        # Questões já pontuadas: {question_id: ids das respostas corretas}
+        self.closed_rounds = {}
+        # Canal de cada jogador, para enviar só o resultado dele
+        self.channels = {}
+        self.player_ids = array('q')
+        self._player_index = {}
+        self._streaks = np.zeros(0, dtype=np.int64)
+
+    def __len__(self):
+        return len(self.player_ids)
+
+    def player_index(self, player_id):
+        index = self._player_index.get(player_id)
+        if index is None:
+            index = len(self.player_ids)
+            self._player_index[player_id] = index
+            self.player_ids.append(player_id)
+        return index
+
+    def close(self, round_answers):
+        """Tira a rodada das abertas; devolve False se ela já foi fechada."""
+        if self.rounds.get(round_answers.question_id) is not round_answers:
+            return False
+        del self.rounds[round_answers.question_id]
+        self.closed_rounds[round_answers.question_id] = round_answers.correct_answer_ids
+        return True
+
+    def streaks(self, size):
+        if len(self._streaks) < size:
+            self._streaks = np.concatenate(
+                [self._streaks, np.zeros(size - len(self._streaks), dtype=np.int64)]
+            )
+        return self._streaks
+
+    def set_streaks(self, streaks):
+        self._streaks = streaks
+
+    def score(self, round_answers):
+        """Calcula os deltas da rodada numa única passada vetorizada.
+
+        Retorna (ids dos jogadores, deltas inteiros), alinhados por resposta.
+        """
+        ctx = RoundContext(round_answers, self)
+        deltas = np.zeros(len(round_answers), dtype=np.float64)
+        for rule in self.rules:
+            deltas = rule.apply(ctx, deltas)
+        player_ids = np.frombuffer(self.player_ids, dtype=np.int64)[ctx.players]
+        return player_ids, np.rint(deltas).astype(np.int64)
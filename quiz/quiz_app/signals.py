@@ -0,0 +1,32 @@
+import os
+
+from django.conf import settings
+from django.db import transaction
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+
+from .models import Answer, Option, Question, Theme
+from .snapshot import build_snapshot
+
+
+def _rebuild():
+    build_snapshot()
+
+
+@receiver([post_save, post_delete], sender=Theme)
+@receiver([post_save, post_delete], sender=Question)
+@receiver([post_save, post_delete], sender=Answer)
+@receiver([post_save, post_delete], sender=Option)
+def rebuild_question_snapshot(sender, **kwargs):
+    # Só regenera se o snapshot já estiver em uso (criado pelo comando)
+    if not os.path.exists(settings.QUESTION_SNAPSHOT_PATH):
+        return
+    # Uma regeneração por transação: se já há um _rebuild pendente nesta
+    # conexão, não agenda outro. Callbacks de savepoints desfeitos já saem
+    # da fila, então um rollback não impede a próxima regeneração.
+    connection = transaction.get_connection()
+    if connection.in_atomic_block and any(
+        entry[1] is _rebuild for entry in connection.run_on_commit
+    ):
+        return
+    transaction.on_commit(_rebuild)
@@ -0,0 +1,251 @@
+import mmap
+import os
+import struct
+import tempfile
+import threading
+
+from django.conf import settings
+
+# Formato do snapshot (little-endian):
+#   cabeçalho | temas | questões | respostas | opções | pool de strings
+# As tabelas têm registros de tamanho fixo; textos ficam no pool em UTF-8
+# e são referenciados por (offset, tamanho). Temas ficam ordenados por id e
+# questões agrupadas por tema, então cada tema aponta para uma faixa contínua.
+MAGIC = b'QZSB'
+FORMAT_VERSION = 1
+
+HEADER = struct.Struct('<4sIIIII')     # magic, versão, nº temas, questões, respostas, opções
+THEME = struct.Struct('<qIIII')        # id, nome (off, len), primeira questão, nº questões
+QUESTION = struct.Struct('<qqqiiIIIIII')  # id, tema, pontos, ordem, tempo, texto (off, len),
+                                          # primeira resposta, nº respostas, primeira opção, nº opções
+CHOICE = struct.Struct('<qIIB3x')      # id, texto (off, len), correta — usado em respostas e opções
+
+
+class SnapshotError(Exception):
+    pass
+
+
+class _StringPool:
+    def __init__(self):
+        self.data = bytearray()
+        self.offsets = {}
+
+    def add(self, text):
+        # Textos repetidos (ex.: "Verdadeiro"/"Falso") são gravados uma vez só
+        encoded = text.encode('utf-8')
+        offset = self.offsets.get(encoded)
+        if offset is None:
+            offset = len(self.data)
+            self.offsets[encoded] = offset
+            self.data += encoded
+        return offset, len(encoded)
+
+
+def write_snapshot(path, themes, questions, answers, options):
+    """Grava o snapshot de forma atômica.
+
+    `themes` são tuplas (id, nome); `questions` são (id, tema_id, pontos,
+    ordem, tempo_limite, texto); `answers` e `options` são
+    (id, questao_id, texto, correta).
+    """
+    pool = _StringPool()
+    themes = sorted(themes)
+    theme_ids = {theme_id for theme_id, _ in themes}
+    questions = sorted(
+        (q for q in questions if q[1] in theme_ids),
+        key=lambda q: (q[1], q[3], q[0])
+    )
+
+    def group(choices):
+        grouped = {}
+        for choice_id, question_id, text, is_correct in sorted(choices):
+            grouped.setdefault(question_id, []).append((choice_id, text, is_correct))
+        return grouped
+
+    answers_by_question = group(answers)
+    options_by_question = group(options)
+
+    question_rows = bytearray()
+    answer_rows = bytearray()
+    option_rows = bytearray()
+    theme_ranges = {}
+    answer_count = option_count = 0
+
+    for index, (question_id, theme_id, points, order, time_limit, text) in enumerate(questions):
+        first, count = theme_ranges.get(theme_id, (index, 0))
+        theme_ranges[theme_id] = (first, count + 1)
+
+        question_answers = answers_by_question.get(question_id, [])
+        question_options = options_by_question.get(question_id, [])
+        question_rows += QUESTION.pack(
+            question_id, theme_id, points, order, time_limit, *pool.add(text),
+            answer_count, len(question_answers), option_count, len(question_options)
+        )
+        for choice_id, choice_text, is_correct in question_answers:
+            answer_rows += CHOICE.pack(choice_id, *pool.add(choice_text), is_correct)
+        for choice_id, choice_text, is_correct in question_options:
+            option_rows += CHOICE.pack(choice_id, *pool.add(choice_text), is_correct)
+        answer_count += len(question_answers)
+        option_count += len(question_options)
+
+    theme_rows = bytearray()
+    for theme_id, name in themes:
+        first, count = theme_ranges.get(theme_id, (0, 0))
+        theme_rows += THEME.pack(theme_id, *pool.add(name), first, count)
+
+    header = HEADER.pack(MAGIC, FORMAT_VERSION, len(themes), len(questions),
+                         answer_count, option_count)
+
+    # Escreve num temporário no mesmo diretório e troca com os.replace:
+    # quem já mapeou o arquivo antigo continua lendo uma versão consistente
+    directory = os.path.dirname(os.path.abspath(path))
+    fd, tmp_path = tempfile.mkstemp(dir=directory, prefix='.snapshot-')
+    try:
+        # mkstemp cria com 0600; workers podem rodar com outro usuário
+        if hasattr(os, 'fchmod'):
+            os.fchmod(fd, 0o644)
+        with os.fdopen(fd, 'wb') as f:
+            for chunk in (header, theme_rows, question_rows, answer_rows, option_rows, pool.data):
+                f.write(chunk)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp_path, path)
+    except BaseException:
+        os.unlink(tmp_path)
+        raise
+
+
+def build_snapshot(path=None):
+    from .models import Answer, Option, Question, Theme
+
+    path = path or settings.QUESTION_SNAPSHOT_PATH
+    write_snapshot(
+        path,
+        Theme.objects.values_list('id', 'name'),
+        Question.objects.values_list('id', 'category_id', 'points', 'order', 'time_limit', 'text'),
+        Answer.objects.values_list('id', 'question_id', 'text', 'is_correct'),
+        Option.objects.values_list('id', 'question_id', 'text', 'is_correct'),
+    )
+    return path
+
+
+class QuestionSnapshot:
+    """Leitura preguiçosa de um snapshot mapeado em memória.
+
+    Os registros são lidos direto do mmap com `struct.unpack_from`, então
+    vários processos abrindo o mesmo arquivo compartilham as páginas do
+    page cache do sistema operacional.
+    """
+
+    def __init__(self, path):
+        self.path = path
+        with open(path, 'rb') as f:
+            stat = os.fstat(f.fileno())
+            self.identity = (stat.st_ino, stat.st_mtime_ns)
+            if stat.st_size < HEADER.size:
+                raise SnapshotError(f"Snapshot inválido: {path}")
+            self._mm = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+
+        magic, version, self.theme_count, self.question_count, answer_count, option_count = \
+            HEADER.unpack_from(self._mm, 0)
+        if magic != MAGIC or version != FORMAT_VERSION:
+            self._mm.close()
+            raise SnapshotError(f"Formato de snapshot não suportado: {path}")
+
+        self._themes_at = HEADER.size
+        self._questions_at = self._themes_at + self.theme_count * THEME.size
+        self._answers_at = self._questions_at + self.question_count * QUESTION.size
+        self._options_at = self._answers_at + answer_count * CHOICE.size
+        self._pool_at = self._options_at + option_count * CHOICE.size
+
+    def close(self):
+        self._mm.close()
+
+    def _string(self, offset, length):
+        start = self._pool_at + offset
+        return self._mm[start:start + length].decode('utf-8')
+
+    def _find_theme(self, theme_id):
+        # Busca binária: a tabela de temas está ordenada por id
+        low, high = 0, self.theme_count
+        while low < high:
+            middle = (low + high) // 2
+            current_id = THEME.unpack_from(self._mm, self._themes_at + middle * THEME.size)[0]
+            if current_id < theme_id:
+                low = middle + 1
+            else:
+                high = middle
+        if low < self.theme_count:
+            record = THEME.unpack_from(self._mm, self._themes_at + low * THEME.size)
+            if record[0] == theme_id:
+                return record
+        return None
+
+    def _choices(self, table_at, first, count):
+        for index in range(first, first + count):
+            choice_id, text_offset, text_length, is_correct = \
+                CHOICE.unpack_from(self._mm, table_at + index * CHOICE.size)
+            yield {
+                'id': choice_id,
+                'text': self._string(text_offset, text_length),
+                'is_correct': bool(is_correct)
+            }
+
+    def question(self, index):
+        (question_id, theme_id, points, order, time_limit, text_offset, text_length,
+         first_answer, answer_count, first_option, option_count) = \
+            QUESTION.unpack_from(self._mm, self._questions_at + index * QUESTION.size)
+        return {
+            'id': question_id,
+            'text': self._string(text_offset, text_length),
+            'time_limit': time_limit,
+            'answers': list(self._choices(self._answers_at, first_answer, answer_count))
+        }
+
+    def theme_name(self, theme_id):
+        record = self._find_theme(theme_id)
+        return self._string(record[1], record[2]) if record else None
+
+    def iter_theme_questions(self, theme_id):
+        record = self._find_theme(theme_id)
+        if record is None:
+            return
+        _, _, _, first, count = record
+        for index in range(first, first + count):
+            yield self.question(index)
+
+    def questions_for_themes(self, theme_ids):
+        result = []
+        for theme_id in theme_ids:
+            result.extend(self.iter_theme_questions(theme_id))
+        return result
+
+
+_current = None
+_lock = threading.Lock()
+
+
+def get_snapshot():
+    """Snapshot do processo, reaberto quando o arquivo é regenerado.
+
+    Retorna None se ainda não houver snapshot gerado.
+    """
+    global _current
+    path = getattr(settings, 'QUESTION_SNAPSHOT_PATH', None)
+    if not path:
+        return None
+    try:
+        stat = os.stat(path)
+    except FileNotFoundError:
+        return None
+
+    with _lock:
+        if _current is None or _current.identity != (stat.st_ino, stat.st_mtime_ns):
+            try:
+                snapshot = QuestionSnapshot(path)
+            except (OSError, SnapshotError) as e:
+                print(f"Erro ao abrir snapshot de questões: {e}")
+                return _current
+            # O mapeamento antigo é liberado pelo GC quando ninguém mais o usa
+            _current = snapshot
+        return _current
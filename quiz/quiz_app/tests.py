@@ -1,3 +1,309 @@
-from django.test import TestCase
+import os
+import stat
+import sys
+import tempfile
+import threading
+from unittest import mock
 
-# Create your tests here.
+from asgiref.sync import async_to_sync
+from django.db import transaction
+from django.test import SimpleTestCase, TestCase, override_settings
+
+from .scoring import (CorrectAnswerRule, PartialCreditRule, RoomScoring, RoundAnswers,
+                      SpeedBonusRule, StreakMultiplierRule)
+from . import profiling
+from .consumer import QuizConsumer
+from .models import Answer, Player, Question, Quiz, QuizThemeSelection, Theme
+from .snapshot import QuestionSnapshot, SnapshotError, write_snapshot
+
+
+class QuestionSnapshotTests(SimpleTestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.path = os.path.join(self.tmp.name, 'bank.snap')
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    def write(self):
+        write_snapshot(
+            self.path,
+            themes=[(7, 'História'), (3, 'Geografia'), (9, 'Vazio')],
+            questions=[
+                (10, 3, 10, 2, 30, 'Qual a capital do Brasil?'),
+                (11, 7, 5, 0, 20, 'Em que ano o Brasil foi descoberto?'),
+                (12, 3, 20, 1, 15, 'Qual o maior rio do mundo? 🌊'),
+            ],
+            answers=[
+                (101, 10, 'Rio de Janeiro', False),
+                (100, 10, 'Brasília', True),
+                (102, 12, 'Amazonas', True),
+                (103, 11, '1500', True),
+            ],
+            options=[(200, 11, '1500', True)],
+        )
+        snapshot = QuestionSnapshot(self.path)
+        self.addCleanup(snapshot.close)
+        return snapshot
+
+    def test_round_trip_groups_questions_by_theme_in_order(self):
+        snapshot = self.write()
+        self.assertEqual(snapshot.theme_count, 3)
+        self.assertEqual(snapshot.question_count, 3)
+        self.assertEqual(
+            [q['id'] for q in snapshot.iter_theme_questions(3)], [12, 10]
+        )
+        self.assertEqual(
+            [q['id'] for q in snapshot.questions_for_themes([3, 7])], [12, 10, 11]
+        )
+        self.assertEqual(list(snapshot.iter_theme_questions(9)), [])
+        self.assertEqual(list(snapshot.iter_theme_questions(42)), [])
+
+    def test_round_trip_choices_and_utf8_text(self):
+        snapshot = self.write()
+        capital, = [q for q in snapshot.iter_theme_questions(3) if q['id'] == 10]
+        self.assertEqual(capital, {
+            'id': 10,
+            'text': 'Qual a capital do Brasil?',
+            'time_limit': 30,
+            'answers': [
+                {'id': 100, 'text': 'Brasília', 'is_correct': True},
+                {'id': 101, 'text': 'Rio de Janeiro', 'is_correct': False},
+            ],
+        })
+        self.assertEqual(snapshot.question(0)['text'], 'Qual o maior rio do mundo? 🌊')
+        self.assertEqual(snapshot.theme_name(7), 'História')
+        self.assertIsNone(snapshot.theme_name(42))
+
+    def test_snapshot_is_world_readable(self):
+        self.write()
+        self.assertEqual(stat.S_IMODE(os.stat(self.path).st_mode) & 0o044, 0o044)
+
+    def test_rejects_bad_magic(self):
+        self.write()
+        with open(self.path, 'r+b') as f:
+            f.write(b'XXXX')
+        with self.assertRaises(SnapshotError):
+            QuestionSnapshot(self.path)
+
+    def test_rejects_truncated_file(self):
+        with open(self.path, 'wb') as f:
+            f.write(b'QZ')
+        with self.assertRaises(SnapshotError):
+            QuestionSnapshot(self.path)
+
+
+class SnapshotRebuildSignalTests(TestCase):
+    def setUp(self):
+        tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(tmp.cleanup)
+        self.path = os.path.join(tmp.name, 'bank.snap')
+        open(self.path, 'wb').close()
+        override = override_settings(QUESTION_SNAPSHOT_PATH=self.path)
+        override.enable()
+        self.addCleanup(override.disable)
+        build = mock.patch('quiz_app.signals.build_snapshot')
+        self.build_snapshot = build.start()
+        self.addCleanup(build.stop)
+
+    def test_one_rebuild_per_transaction(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            with transaction.atomic():
+                theme = Theme.objects.create(name='Geografia')
+                question = Question.objects.create(category=theme, text='Capital?')
+                for text in ('Brasília', 'Rio', 'Salvador'):
+                    Answer.objects.create(question=question, text=text)
+        self.assertEqual(self.build_snapshot.call_count, 1)
+
+    def test_rebuild_still_scheduled_after_rolled_back_savepoint(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            try:
+                with transaction.atomic():
+                    Theme.objects.create(name='Desfeito')
+                    raise RuntimeError
+            except RuntimeError:
+                pass
+            Theme.objects.create(name='História')
+        self.assertEqual(self.build_snapshot.call_count, 1)
+
+    def test_no_rebuild_without_snapshot(self):
+        os.unlink(self.path)
+        with self.captureOnCommitCallbacks(execute=True):
+            Theme.objects.create(name='Ciências')
+        self.build_snapshot.assert_not_called()
+
+
+class ScoringTests(SimpleTestCase):
+    def play(self, scoring, question_id, answers, expected=(), points=10, time_limit=30):
+        # answers: [(player_id, answer_id, response_time)]; resposta correta = 1
+        round_answers = RoundAnswers(
+            question_id, points, time_limit, {1},
+            [scoring.player_index(player_id) for player_id in expected]
+        )
+        for player_id, answer_id, response_time in answers:
+            round_answers.add(scoring.player_index(player_id), answer_id, response_time)
+        player_ids, deltas = scoring.score(round_answers)
+        return dict(zip(player_ids.tolist(), deltas.tolist()))
+
+    def test_points_and_speed_bonus(self):
+        scoring = RoomScoring([CorrectAnswerRule(), SpeedBonusRule(max_fraction=0.5)])
+        deltas = self.play(scoring, 1, [(5, 1, 0), (6, 1, 15), (7, 2, 0)], points=20)
+        self.assertEqual(deltas, {5: 30, 6: 25, 7: 0})
+
+    def test_non_finite_and_out_of_range_times_get_no_bonus(self):
+        scoring = RoomScoring([CorrectAnswerRule(), SpeedBonusRule(max_fraction=0.5)])
+        deltas = self.play(scoring, 1, [
+            (1, 1, float('nan')), (2, 1, float('inf')), (3, 1, float('-inf')),
+            (4, 1, 99), (5, 1, -5),
+        ])
+        self.assertEqual(deltas, {1: 10, 2: 10, 3: 10, 4: 10, 5: 15})
+
+    def test_duplicate_answers_are_ignored(self):
+        scoring = RoomScoring([CorrectAnswerRule()])
+        player = scoring.player_index(42)
+        round_answers = RoundAnswers(1, 10, 30, {1}, expected_players=[player])
+        self.assertTrue(round_answers.add(player, 2, 5))
+        self.assertFalse(round_answers.add(player, 1, 1))
+        self.assertEqual(len(round_answers), 1)
+        self.assertTrue(round_answers.is_complete())
+        player_ids, deltas = scoring.score(round_answers)
+        self.assertEqual((player_ids.tolist(), deltas.tolist()), ([42], [0]))
+
+    def test_streak_grows_and_resets_on_wrong_answer(self):
+        scoring = RoomScoring([CorrectAnswerRule(), StreakMultiplierRule(step=0.5, max_multiplier=2.0)])
+        results = [self.play(scoring, q, [(1, answer, 0)]) for q, answer in
+                   enumerate([1, 1, 1, 1, 2, 1])]
+        self.assertEqual([r[1] for r in results], [10, 15, 20, 20, 0, 10])
+
+    def test_streak_kept_for_players_outside_the_round(self):
+        scoring = RoomScoring([CorrectAnswerRule(), StreakMultiplierRule(step=0.5)])
+        self.play(scoring, 1, [(1, 1, 0), (2, 1, 0), (3, 1, 0)])
+        # Jogador 2 estava online e não respondeu: perde a sequência.
+        # Jogador 3 não estava na rodada (ritmo próprio): mantém.
+        self.play(scoring, 2, [(1, 1, 0)], expected=[1, 2])
+        deltas = self.play(scoring, 3, [(1, 1, 0), (2, 1, 0), (3, 1, 0)])
+        self.assertEqual(deltas, {1: 20, 2: 10, 3: 15})
+
+    def test_partial_credit_only_for_wrong_listed_answers(self):
+        scoring = RoomScoring([CorrectAnswerRule(), PartialCreditRule({1: 0.9, 3: 0.5})])
+        deltas = self.play(scoring, 1, [(1, 1, 0), (2, 3, 0), (3, 2, 0), (4, 99, 0)])
+        self.assertEqual(deltas, {1: 10, 2: 5, 3: 0, 4: 0})
+
+    def test_closed_round_cannot_be_closed_again(self):
+        scoring = RoomScoring()
+        round_answers = RoundAnswers(7, 10, 30, {1})
+        scoring.rounds[7] = round_answers
+        self.assertTrue(scoring.close(round_answers))
+        self.assertFalse(scoring.close(round_answers))
+        self.assertEqual(scoring.closed_rounds, {7: frozenset({1})})
+
+
+class ConsumerScoringTests(TestCase):
+    def setUp(self):
+        self.quiz = Quiz.objects.create(code='ABC')
+        selected = Theme.objects.create(name='Geografia')
+        other = Theme.objects.create(name='História')
+        QuizThemeSelection.objects.create(quiz=self.quiz, theme=selected)
+        self.question = Question.objects.create(category=selected, text='Capital?', points=20)
+        self.correct = Answer.objects.create(question=self.question, text='Brasília', is_correct=True)
+        self.other_question = Question.objects.create(category=other, text='Ano?')
+        self.player = Player.objects.create(quiz=self.quiz, username='ana', is_online=True)
+
+        self.consumer = QuizConsumer()
+        self.consumer.quiz = self.quiz
+
+    def test_open_round_only_for_questions_of_the_room(self):
+        question_id, points, _, correct_ids, online_ids = \
+            async_to_sync(self.consumer.open_round)(self.question.id)
+        self.assertEqual((question_id, points, correct_ids, online_ids),
+                         (self.question.id, 20, [self.correct.id], [self.player.id]))
+        self.assertIsNone(async_to_sync(self.consumer.open_round)(self.other_question.id))
+
+    def test_reconnect_and_stale_disconnect_keep_score_and_online_state(self):
+        stale = QuizConsumer()
+        stale.quiz = self.quiz
+        stale.player = async_to_sync(stale.create_player)('ana')
+
+        # Pontos somados no banco enquanto a conexão antiga guarda score=0
+        Player.objects.filter(id=self.player.id).update(score=50)
+        self.consumer.player = async_to_sync(self.consumer.create_player)('ana')
+        async_to_sync(stale.set_player_offline)()
+
+        self.player.refresh_from_db()
+        self.assertEqual(self.player.score, 50)
+        self.assertTrue(self.player.is_online)
+
+        async_to_sync(self.consumer.set_player_offline)()
+        self.player.refresh_from_db()
+        self.assertEqual((self.player.score, self.player.is_online), (50, False))
+
+
+class FakeConsumer:
+    def __init__(self, quiz_code):
+        self.quiz_code = quiz_code
+
+
+# Handler compilado como se estivesse em consumer.py, para o filtro de sala
+_namespace = {}
+exec(compile(
+    "def receive(self, started, release):\n"
+    "    started.set()\n"
+    "    release.wait()\n",
+    profiling.CONSUMER_FILE, 'exec'
+), _namespace)
+consumer_receive = _namespace['receive']
+
+
+class ProfileSessionTests(SimpleTestCase):
+    def sample_consumer_thread(self, session, quiz_code):
+        started, release = threading.Event(), threading.Event()
+        thread = threading.Thread(
+            target=consumer_receive, args=(FakeConsumer(quiz_code), started, release)
+        )
+        thread.start()
+        try:
+            started.wait(5)
+            session._sample(sys._current_frames()[thread.ident])
+        finally:
+            release.set()
+            thread.join(5)
+
+    def test_room_session_keeps_only_stacks_of_its_room(self):
+        session = profiling.ProfileSession(room='ABC')
+        self.sample_consumer_thread(session, 'ABC')
+        self.sample_consumer_thread(session, 'XYZ')
+        session._sample(sys._getframe())
+        self.assertEqual(sum(session.stacks.values()), 1)
+        stack, = session.stacks
+        self.assertIn(';receive (consumer.py:1);', stack)
+
+    def test_global_session_keeps_every_stack(self):
+        session = profiling.ProfileSession()
+        self.sample_consumer_thread(session, 'XYZ')
+        session._sample(sys._getframe())
+        self.assertEqual(sum(session.stacks.values()), 2)
+
+    def test_writes_collapsed_stacks_and_summary(self):
+        session = profiling.ProfileSession(room='ABC', duration=1)
+        session.stacks.update({'main;receive;query': 3, 'main;receive': 1, 'main;idle': 6})
+        session.samples = 10
+        with tempfile.TemporaryDirectory() as output_dir:
+            with self.settings(PROFILE_DIR=output_dir):
+                base = session.write_results()
+            self.assertTrue(base.endswith('-ABC'))
+            with open(f'{base}.collapsed', encoding='utf-8') as f:
+                self.assertEqual(f.read().splitlines(),
+                                 ['main;idle 6', 'main;receive;query 3', 'main;receive 1'])
+            with open(f'{base}.txt', encoding='utf-8') as f:
+                self.assertEqual(f.read(), session.summary())
+
+    def test_summary_ranks_own_and_inclusive_time(self):
+        session = profiling.ProfileSession(room='ABC')
+        session.stacks.update({'main;receive;query': 3, 'main;receive': 1, 'main;idle': 6})
+        lines = session.summary(top_n=2).splitlines()
+        own = lines[lines.index('Top 2 por tempo próprio:') + 1:][:2]
+        total = lines[lines.index('Top 2 por tempo total (inclusivo):') + 1:]
+        self.assertEqual([line.split()[-1] for line in own], ['idle', 'query'])
+        self.assertEqual(own[0].split()[:2], ['6', '60.00%'])
+        self.assertEqual([line.split()[-1] for line in total], ['main', 'idle'])
+        self.assertEqual(total[0].split()[:2], ['10', '100.00%'])